@@ -1,9 +1,40 @@
-from flask import Flask, jsonify, request, render_template
+from flask import Flask, jsonify, request, render_template, Response, stream_with_context
 import requests
+import logging
 from collections import defaultdict
+from itertools import chain
+from readDB import create_store, iter_json_array, PoolTimeout
+from dates import parse_range
+from spatialIndex import SpatialIndex, start_refresh_thread
+from timeHeatmap import HeatmapCache
+from snapshot import open_snapshot
 
 app = Flask(__name__, template_folder='templates')
 
+# Pooled Postgres read path, created once at startup
+try:
+    store = create_store()
+except Exception as e:
+    logging.error(f"Database read path unavailable: {e}")
+    store = None
+
+# Optional warm start: memory-mapped Arrow snapshot of the most recent days (TICKETS_SNAPSHOT)
+snapshot = open_snapshot()
+
+def read_source(start_date, end_date):
+    """Serve the recent window from the mapped snapshot, everything else from Postgres."""
+    if snapshot is not None and start_date and end_date and snapshot.covers(start_date, end_date):
+        return snapshot
+    return store
+
+# Spatial index over ingested tickets, built and refreshed in the background
+spatial = SpatialIndex()
+if store is not None:
+    start_refresh_thread(spatial, store)
+
+# Per-month hour x weekday x violation_code histograms
+heatmaps = HeatmapCache(store) if store is not None else None
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -50,6 +81,115 @@ def get_tickets():
     except requests.RequestException as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/db/tickets')
+def get_db_tickets():
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    try:
+        parse_range(start_date, end_date)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    source = read_source(start_date, end_date)
+    if source is None:
+        return jsonify({'error': 'Database not configured'}), 503
+    chunks = source.stream_tickets(start_date, end_date)
+    try:
+        first = next(chunks, [])  # Check out the connection before the response starts
+    except PoolTimeout as e:
+        return jsonify({'error': str(e)}), 503
+
+    body = iter_json_array(chain([first], chunks))
+    return Response(stream_with_context(body), mimetype='application/json')
+
+@app.route('/api/db/summary')
+def get_db_summary():
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    try:
+        parse_range(start_date, end_date)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    source = read_source(start_date, end_date)
+    if source is None:
+        return jsonify({'error': 'Database not configured'}), 503
+    try:
+        summary_data = source.summary(start_date, end_date)
+        totals = source.totals(start_date, end_date)
+    except PoolTimeout as e:
+        return jsonify({'error': str(e)}), 503
+    return jsonify({'summary': summary_data, **totals})
+
+@app.route('/healthz')
+def healthz():
+    if store is None:
+        return jsonify({'ok': False, 'error': 'Database not configured'}), 503
+    health = store.health()
+    return jsonify(health), 200 if health['ok'] else 503
+
+@app.route('/metrics/pool')
+def pool_metrics():
+    if store is None:
+        return jsonify({'error': 'Database not configured'}), 503
+    return jsonify(store.metrics())
+
+def spatial_query(query, *args):
+    """Run a spatial index query: 503 while the index loads, 400 for invalid arguments."""
+    if not spatial.ready:
+        return jsonify({'error': 'Spatial index is still loading'}), 503
+    try:
+        return jsonify(query(*args))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/spatial/radius')
+def spatial_radius():
+    return spatial_query(
+        spatial.radius,
+        request.args.get('lat', type=float), request.args.get('lon', type=float),
+        request.args.get('radius_m', 300, type=float),
+        request.args.get('start_date'), request.args.get('end_date'),
+        request.args.get('limit', 1000, type=int))
+
+@app.route('/api/spatial/bbox')
+def spatial_bbox():
+    return spatial_query(
+        spatial.bbox,
+        request.args.get('min_lat', type=float), request.args.get('min_lon', type=float),
+        request.args.get('max_lat', type=float), request.args.get('max_lon', type=float),
+        request.args.get('start_date'), request.args.get('end_date'),
+        request.args.get('limit', 1000, type=int))
+
+@app.route('/api/spatial/nearest')
+def spatial_nearest():
+    return spatial_query(
+        spatial.nearest,
+        request.args.get('lat', type=float), request.args.get('lon', type=float),
+        request.args.get('k', 10, type=int),
+        request.args.get('start_date'), request.args.get('end_date'))
+
+@app.route('/api/spatial/hotspots')
+def spatial_hotspots():
+    by = request.args.get('by', 'fine_total')
+    if by not in ('fine_total', 'count'):
+        return jsonify({'error': "by must be 'fine_total' or 'count'"}), 400
+    return spatial_query(
+        lambda *args: {'hotspots': spatial.hotspots(*args)},
+        request.args.get('start_date'), request.args.get('end_date'),
+        request.args.get('top', 50, type=int), by)
+
+@app.route('/api/analytics/heatmap')
+def time_heatmap():
+    if heatmaps is None:
+        return jsonify({'error': 'Database not configured'}), 503
+    violation_code = request.args.get('violation_code')
+    codes = violation_code.split(',') if violation_code else None
+    try:
+        return jsonify(heatmaps.heatmap(request.args.get('start_date'), request.args.get('end_date'), codes))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except PoolTimeout as e:
+        return jsonify({'error': str(e)}), 503
+
 if __name__ == '__main__':
     app.run(debug=True)
 
@@ -0,0 +1,38 @@
+from datetime import date, timedelta
+
+EPOCH = date(1970, 1, 1)
+
+
+def parse_day(value, default=None):
+    """Accept a date, an ISO date string or None (-> default); raises ValueError for anything else."""
+    if value is None or value == "":
+        return default
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        raise ValueError(f"Invalid date {value!r}: expected YYYY-MM-DD") from None
+
+
+def parse_range(start_date, end_date):
+    """Validate a required, inclusive YYYY-MM-DD range; raises ValueError with a client-facing message."""
+    start_day = parse_day(start_date)
+    end_day = parse_day(end_date)
+    if start_day is None or end_day is None:
+        raise ValueError("start_date and end_date are required (YYYY-MM-DD)")
+    if start_day > end_day:
+        raise ValueError("start_date must not be after end_date")
+    return start_day, end_day
+
+
+def epoch_day(value):
+    """Days since 1970-01-01 for a date or ISO date string."""
+    return (parse_day(value) - EPOCH).days
+
+
+def month_bounds(year, month):
+    """First and last day of a month."""
+    first = date(year, month, 1)
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return first, last
@@ -1,14 +1,72 @@
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 import requests
+import logging
 from pydantic import BaseModel
 from collections import defaultdict
-from typing import List, Tuple
+from itertools import chain
+from typing import List, Optional, Tuple
+from readDB import create_store, iter_json_array, PoolTimeout
+from dates import parse_range
+from spatialIndex import SpatialIndex, start_refresh_thread
+from timeHeatmap import HeatmapCache
+from snapshot import open_snapshot
 
 app = FastAPI()
 templates = Jinja2Templates(directory='templates')
 
+# Pooled Postgres read path and the heatmap cache on top of it, created at startup
+store = None
+heatmaps = None
+
+# Optional warm start: memory-mapped Arrow snapshot of the most recent days (TICKETS_SNAPSHOT)
+snapshot = None
+
+# Spatial index over ingested tickets, built and refreshed in the background
+spatial = SpatialIndex()
+
+@app.on_event("startup")
+def open_store():
+    global store, heatmaps, snapshot
+    snapshot = open_snapshot()
+    try:
+        store = create_store()
+    except Exception as e:
+        logging.error(f"Database read path unavailable: {e}")
+        return
+    heatmaps = HeatmapCache(store)
+    start_refresh_thread(spatial, store)
+
+@app.on_event("shutdown")
+def close_store():
+    if store is not None:
+        store.close()
+
+def require_store():
+    if store is None:
+        raise HTTPException(status_code=503, detail="Database not configured")
+    return store
+
+def read_source(start_date: str, end_date: str):
+    """Serve the recent window from the mapped snapshot, everything else from Postgres."""
+    try:
+        parse_range(start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if snapshot is not None and snapshot.covers(start_date, end_date):
+        return snapshot
+    return require_store()
+
+def spatial_query(query, *args):
+    """Run a spatial index query: 503 while the index loads, 400 for invalid arguments."""
+    if not spatial.ready:
+        raise HTTPException(status_code=503, detail="Spatial index is still loading")
+    try:
+        return query(*args)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 class TicketSummary(BaseModel):
     make: str
     color: str
@@ -51,6 +109,68 @@ async def get_tickets(start_date: str, end_date: str):
     except requests.RequestException as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Blocking psycopg2 calls: plain def endpoints run in FastAPI's threadpool
+@app.get("/api/db/tickets")
+def get_db_tickets(start_date: str, end_date: str):
+    chunks = read_source(start_date, end_date).stream_tickets(start_date, end_date)
+    try:
+        first = next(chunks, [])  # Check out the connection before the response starts
+    except PoolTimeout as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return StreamingResponse(iter_json_array(chain([first], chunks)), media_type="application/json")
+
+@app.get("/api/db/summary", response_model=dict)
+def get_db_summary(start_date: str, end_date: str):
+    db = read_source(start_date, end_date)
+    try:
+        summary_data = [TicketSummary(**row) for row in db.summary(start_date, end_date)]
+        totals = db.totals(start_date, end_date)
+    except PoolTimeout as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {'summary': summary_data, **totals}
+
+@app.get("/healthz")
+def healthz():
+    health = require_store().health()
+    return JSONResponse(health, status_code=200 if health['ok'] else 503)
+
+@app.get("/metrics/pool")
+def pool_metrics():
+    return require_store().metrics()
+
+@app.get("/api/spatial/radius", response_model=dict)
+def spatial_radius(lat: float, lon: float, radius_m: float = 300, start_date: Optional[str] = None,
+                   end_date: Optional[str] = None, limit: int = 1000):
+    return spatial_query(spatial.radius, lat, lon, radius_m, start_date, end_date, limit)
+
+@app.get("/api/spatial/bbox", response_model=dict)
+def spatial_bbox(min_lat: float, min_lon: float, max_lat: float, max_lon: float, start_date: Optional[str] = None,
+                 end_date: Optional[str] = None, limit: int = 1000):
+    return spatial_query(spatial.bbox, min_lat, min_lon, max_lat, max_lon, start_date, end_date, limit)
+
+@app.get("/api/spatial/nearest", response_model=dict)
+def spatial_nearest(lat: float, lon: float, k: int = 10, start_date: Optional[str] = None,
+                    end_date: Optional[str] = None):
+    return spatial_query(spatial.nearest, lat, lon, k, start_date, end_date)
+
+@app.get("/api/spatial/hotspots", response_model=dict)
+def spatial_hotspots(start_date: Optional[str] = None, end_date: Optional[str] = None, top: int = 50,
+                     by: str = "fine_total"):
+    if by not in ("fine_total", "count"):
+        raise HTTPException(status_code=400, detail="by must be 'fine_total' or 'count'")
+    return {'hotspots': spatial_query(spatial.hotspots, start_date, end_date, top, by)}
+
+@app.get("/api/analytics/heatmap", response_model=dict)
+def time_heatmap(start_date: str, end_date: str, violation_code: Optional[str] = None):
+    require_store()
+    codes = violation_code.split(",") if violation_code else None
+    try:
+        return heatmaps.heatmap(start_date, end_date, codes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except PoolTimeout as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
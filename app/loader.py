@@ -0,0 +1,678 @@
+import argparse
+import io
+import logging
+import queue
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from config import get_api_token
+from socrata import SocrataFetcher
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Define pagination parameters
+LIMIT = 50000  # Fetch 50,000 records per request
+
+# Issue years kept by clean_dataframe
+YEARS = [2025, 2024, 2023, 2022, 2021, 2020]
+
+# Pages a sink may fall behind the fetcher before the fetcher waits for it
+SINK_QUEUE_DEPTH = 4
+
+# Columns kept from the API (without marked_time and agency_desc)
+COLUMNS = [
+    "ticket_number", "issue_date", "issue_time", "rp_state_plate",
+    "plate_expiry_date", "make", "body_style", "color", "location", "agency",
+    "violation_code", "fine_amount", "loc_lat", "loc_long"
+]
+
+# Define PostgreSQL Schema
+TABLE_DEFINITION = """parking_tickets (
+    ticket_number TEXT PRIMARY KEY,
+    issue_date DATE NOT NULL,
+    issue_time TIME NOT NULL,
+    rp_state_plate TEXT,
+    plate_expiry_date DATE,
+    make TEXT,
+    body_style TEXT,
+    color TEXT,
+    location TEXT NOT NULL,
+    agency TEXT NOT NULL,
+    violation_code TEXT NOT NULL,
+    fine_amount NUMERIC NOT NULL,
+    loc_lat NUMERIC NOT NULL,
+    loc_long NUMERIC NOT NULL
+)"""
+
+CREATE_TABLE_QUERY = f"""
+DROP TABLE IF EXISTS parking_tickets;
+CREATE TABLE {TABLE_DEFINITION};
+"""
+
+CREATE_TABLE_IF_MISSING_QUERY = f"""
+CREATE TABLE IF NOT EXISTS {TABLE_DEFINITION};
+"""
+
+# UNLOGGED staging table for the staged load mode: no WAL, no primary key
+CREATE_STAGING_TABLE_QUERY = """
+DROP TABLE IF EXISTS parking_tickets_staging;
+CREATE UNLOGGED TABLE parking_tickets_staging (LIKE parking_tickets INCLUDING DEFAULTS);
+"""
+
+# Same table for DuckDB, with native floating point columns
+CREATE_DUCKDB_TABLE_QUERY = """
+DROP TABLE IF EXISTS parking_tickets;
+CREATE TABLE parking_tickets (
+    ticket_number VARCHAR PRIMARY KEY,
+    issue_date DATE,
+    issue_time TIME,
+    rp_state_plate VARCHAR,
+    plate_expiry_date DATE,
+    make VARCHAR,
+    body_style VARCHAR,
+    color VARCHAR,
+    location VARCHAR,
+    agency VARCHAR,
+    violation_code VARCHAR,
+    fine_amount DOUBLE,
+    loc_lat DOUBLE,
+    loc_long DOUBLE
+);
+"""
+
+INSERT_QUERY = """
+INSERT INTO parking_tickets (
+    ticket_number, issue_date, issue_time, rp_state_plate,
+    plate_expiry_date, make, body_style, color, location, agency,
+    violation_code, fine_amount, loc_lat, loc_long
+) VALUES %s
+ON CONFLICT (ticket_number) DO NOTHING;
+"""
+
+COPY_STAGING_QUERY = f"""
+COPY parking_tickets_staging ({", ".join(COLUMNS)})
+FROM STDIN WITH (FORMAT csv, NULL '\\N')
+"""
+
+# One set-based statement moves the whole batch; the anti-join runs as a single hash/merge join
+MERGE_STAGING_QUERY = f"""
+INSERT INTO parking_tickets ({", ".join(COLUMNS)})
+SELECT DISTINCT ON (s.ticket_number) {", ".join("s." + col for col in COLUMNS)}
+FROM parking_tickets_staging s
+WHERE NOT EXISTS (
+    SELECT 1 FROM parking_tickets p WHERE p.ticket_number = s.ticket_number
+);
+"""
+
+
+def convert_plate_expiry(date_str):
+    """Convert YYYYMM to YYYY-MM-01 format. Handle '0' values."""
+    try:
+        if date_str == "0" or pd.isna(date_str):  # Handle invalid values
+            return None  # Store as NULL in PostgreSQL
+        return pd.to_datetime(date_str, format="%Y%m").strftime("%Y-%m-01")
+    except ValueError:
+        logging.error(f"Invalid plate_expiry_date format: {date_str}")
+        return None  # Return None if conversion fails
+
+
+def convert_time(time_str):
+    """Convert HHMM format to HH:MM:SS for PostgreSQL TIME type."""
+    try:
+        time_str = str(time_str).zfill(4)  # Ensure it's at least 4 chars (e.g., '845' -> '0845')
+        return pd.to_datetime(time_str, format="%H%M").strftime("%H:%M:%S")
+    except (ValueError, TypeError):
+        logging.error(f"Invalid time format: {time_str}")
+        return None
+
+
+def clean_dataframe(df):
+    """Clean and transform the DataFrame for PostgreSQL insertion, filtering by years."""
+    if df.empty:
+        logging.warning("Received an empty DataFrame. Skipping processing.")
+        return df
+
+    df = df.loc[:, [col for col in COLUMNS if col in df.columns]]
+
+    # Convert issue_date to datetime for filtering
+    df["issue_date"] = pd.to_datetime(df["issue_date"], errors="coerce")
+
+    # Filter rows where issue_date is selected
+    df = df[df["issue_date"].dt.year.isin(YEARS)]
+
+    # Convert 'plate_expiry_date' from YYYYMM to YYYY-MM-01
+    df["plate_expiry_date"] = df["plate_expiry_date"].apply(convert_plate_expiry)
+
+    # Convert 'issue_time' to HH:MM:SS format
+    df["issue_time"] = df["issue_time"].apply(convert_time)
+
+    # Rows the NOT NULL columns would reject (e.g. issue_time "2400") are dropped here, not at insert
+    required = [col for col in ("issue_time", "location", "agency") if col in df.columns]
+    invalid = df[required].isna().any(axis=1)
+    if invalid.any():
+        logging.warning(f"Dropping {int(invalid.sum())} rows with missing {', '.join(required)}.")
+        df = df[~invalid]
+
+    # Handle missing values
+    df["make"] = df["make"].fillna("Unknown")
+    df["body_style"] = df["body_style"].fillna("Unknown")
+    df["color"] = df["color"].fillna("Unknown")
+    df["violation_code"] = df["violation_code"].fillna("Unknown")
+
+    df["fine_amount"] = df["fine_amount"].fillna(0)
+    df["loc_lat"] = df["loc_lat"].fillna(0)
+    df["loc_long"] = df["loc_long"].fillna(0)
+
+    df = df.where(pd.notnull(df), None)  # Convert missing values to None
+
+    logging.info(f"Filtered DataFrame shape (only years {max(YEARS)}-{min(YEARS)}): {df.shape}")
+    return df
+
+
+def arrow_schema():
+    """Arrow schema shared by the DuckDB and Parquet sinks."""
+    import pyarrow as pa
+
+    return pa.schema([
+        ("ticket_number", pa.string()),
+        ("issue_date", pa.date32()),
+        ("issue_time", pa.time32("s")),
+        ("rp_state_plate", pa.string()),
+        ("plate_expiry_date", pa.date32()),
+        ("make", pa.string()),
+        ("body_style", pa.string()),
+        ("color", pa.string()),
+        ("location", pa.string()),
+        ("agency", pa.string()),
+        ("violation_code", pa.string()),
+        ("fine_amount", pa.float64()),
+        ("loc_lat", pa.float64()),
+        ("loc_long", pa.float64()),
+    ])
+
+
+def to_arrow(df):
+    """Convert a cleaned DataFrame into an Arrow table with a fixed schema."""
+    import pyarrow as pa
+
+    arrays = []
+    for field in arrow_schema():
+        series = df[field.name] if field.name in df.columns else pd.Series([None] * len(df), dtype=object)
+        if pa.types.is_date32(field.type):
+            dates = pd.to_datetime(series, errors="coerce")
+            array = pa.array(dates, type=pa.timestamp("ns"), from_pandas=True).cast(field.type)
+        elif pa.types.is_time32(field.type):
+            seconds = pd.to_timedelta(series, errors="coerce").dt.total_seconds()
+            array = pa.array(seconds, type=pa.float64(), from_pandas=True).cast(pa.int32()).cast(field.type)
+        elif pa.types.is_floating(field.type):
+            array = pa.array(pd.to_numeric(series, errors="coerce"), type=field.type, from_pandas=True)
+        else:
+            array = pa.array(series.astype("string"), type=field.type, from_pandas=True)
+        arrays.append(array)
+    return pa.Table.from_arrays(arrays, schema=arrow_schema())
+
+
+def copy_buffer(df):
+    """Render a cleaned DataFrame as CSV for COPY_STAGING_QUERY."""
+    buffer = io.StringIO()
+    df.reindex(columns=COLUMNS).to_csv(buffer, index=False, header=False, na_rep="\\N", date_format="%Y-%m-%d")
+    buffer.seek(0)
+    return buffer
+
+
+class Sink:
+    """A destination for cleaned pages. Subclasses implement setup/write/close."""
+
+    database = False  # Snapshots are only published when every database sink loaded fully
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+        self.seconds = 0.0
+        self.failed = False
+        self.failed_batches = 0
+        self.aborted = False  # Set when the fetch fails part way through
+
+    def setup(self):
+        """Prepare the destination (create tables, open files)."""
+
+    def write(self, df):
+        """Write one cleaned page."""
+        raise NotImplementedError
+
+    def rollback(self):
+        """Discard whatever a failed write left behind so the next page starts clean."""
+
+    def close(self):
+        """Flush and release resources."""
+
+    def publish(self):
+        """Make the output visible to readers; run() calls this after every sink has finished."""
+
+    @property
+    def ok(self):
+        """True when every page reached the destination."""
+        return not (self.failed or self.failed_batches or self.aborted)
+
+    def report(self):
+        """Log rows written and throughput for this sink."""
+        rate = self.rows / self.seconds if self.seconds else 0
+        status = "FAILED" if self.failed else f"{self.failed_batches} pages skipped" if self.failed_batches else "ok"
+        logging.info(f"[{self.name}] {status}: {self.rows} rows in {self.seconds:.1f}s ({rate:,.0f} rows/s)")
+
+
+class SeenTickets:
+    """Exact, compact membership set of ticket numbers already loaded.
+
+    Numeric ticket numbers without leading zeros (nearly all of them) are kept as a sorted int64 array,
+    8 bytes each; anything else falls back to a Python set. Unlike a Bloom filter
+    this never reports a false positive, so no new ticket is ever dropped.
+    """
+
+    def __init__(self):
+        self.numeric = np.empty(0, dtype=np.int64)
+        self.other = set()
+
+    def __len__(self):
+        return len(self.numeric) + len(self.other)
+
+    def add(self, ticket_numbers):
+        """Add ticket numbers without checking membership."""
+        ticket_numbers = pd.Series(ticket_numbers, dtype="string").dropna()
+        is_numeric = ticket_numbers.str.fullmatch(r"[1-9]\d{0,17}").fillna(False).to_numpy(dtype=bool)
+        self._merge(np.unique(ticket_numbers[is_numeric].astype("int64").to_numpy()))
+        self.other.update(ticket_numbers[~is_numeric])
+
+    def filter_new(self, ticket_numbers):
+        """Return a boolean mask of tickets not seen before, and remember them.
+
+        Duplicates within the same batch are also masked out after their first occurrence.
+        """
+        ticket_numbers = pd.Series(ticket_numbers, dtype="string").reset_index(drop=True)
+        keep = (~ticket_numbers.duplicated() & ticket_numbers.notna()).to_numpy(dtype=bool, copy=True)
+        is_numeric = ticket_numbers.str.fullmatch(r"[1-9]\d{0,17}").fillna(False).to_numpy(dtype=bool)
+
+        # Numeric tickets: binary search in the sorted array
+        numeric_idx = np.flatnonzero(is_numeric & keep)
+        values = ticket_numbers[numeric_idx].astype("int64").to_numpy()
+        pos = np.searchsorted(self.numeric, values)
+        found = pos < len(self.numeric)
+        found[found] = self.numeric[pos[found]] == values[found]
+        keep[numeric_idx[found]] = False
+        self._merge(np.sort(values[~found]))
+
+        # Everything else: plain set lookup
+        for i in np.flatnonzero(~is_numeric & keep):
+            ticket = ticket_numbers[i]
+            if ticket in self.other:
+                keep[i] = False
+            else:
+                self.other.add(ticket)
+        return keep
+
+    def _merge(self, values):
+        """Insert already sorted, unique values into the sorted array in O(n + m log n)."""
+        if len(values):
+            self.numeric = np.insert(self.numeric, np.searchsorted(self.numeric, values), values)
+
+
+class PostgresSink(Sink):
+    """Load into PostgreSQL over a single connection held for the whole run.
+
+    mode="insert" sends rows with execute_values and ON CONFLICT DO NOTHING.
+    mode="staged" drops known duplicates client-side, COPYs the rest into an
+    UNLOGGED staging table and merges it with one INSERT ... SELECT.
+    With recreate=False the existing table is kept and, in staged mode, its
+    ticket numbers seed the duplicate filter.
+    """
+
+    database = True
+
+    def __init__(self, name, connection_string, page_size=5000, mode="insert", recreate=True):
+        super().__init__(name)
+        if mode not in ("insert", "staged"):
+            raise ValueError(f"Unknown load mode: {mode}")
+        self.connection_string = connection_string
+        self.page_size = page_size
+        self.mode = mode
+        self.recreate = recreate
+        self.seen = SeenTickets()
+        self.skipped = 0
+        self.conn = None
+
+    def setup(self):
+        import psycopg2
+
+        self.conn = psycopg2.connect(self.connection_string)
+        with self.conn.cursor() as cursor:
+            cursor.execute(CREATE_TABLE_QUERY if self.recreate else CREATE_TABLE_IF_MISSING_QUERY)
+            if self.mode == "staged":
+                cursor.execute(CREATE_STAGING_TABLE_QUERY)
+        self.conn.commit()
+        if self.recreate:
+            logging.info(f"[{self.name}] Table 'parking_tickets' dropped and recreated successfully.")
+        elif self.mode == "staged":
+            self._load_seen()
+
+    def _load_seen(self):
+        """Stream existing ticket numbers into the duplicate filter."""
+        with self.conn.cursor(name="seen_tickets") as cursor:
+            cursor.itersize = 100000
+            cursor.execute("SELECT ticket_number FROM parking_tickets")
+            while True:
+                rows = cursor.fetchmany(cursor.itersize)
+                if not rows:
+                    break
+                self.seen.add([row[0] for row in rows])
+        self.conn.commit()
+        logging.info(f"[{self.name}] Loaded {len(self.seen)} existing ticket numbers.")
+
+    def write(self, df):
+        if self.mode == "staged":
+            self._write_staged(df)
+        else:
+            self._write_insert(df)
+
+    def _write_insert(self, df):
+        from psycopg2.extras import execute_values
+
+        data_tuples = [tuple(x) for x in df.reindex(columns=COLUMNS).to_numpy()]
+        with self.conn.cursor() as cursor:
+            execute_values(cursor, INSERT_QUERY, data_tuples, page_size=self.page_size)
+        self.conn.commit()
+
+    def _write_staged(self, df):
+        keep = self.seen.filter_new(df["ticket_number"])
+        self.skipped += len(df) - int(keep.sum())
+        df = df[keep]
+        if df.empty:
+            return
+
+        with self.conn.cursor() as cursor:
+            cursor.execute("TRUNCATE parking_tickets_staging")
+            cursor.copy_expert(COPY_STAGING_QUERY, copy_buffer(df))
+            cursor.execute(MERGE_STAGING_QUERY)
+        self.conn.commit()
+
+    def report(self):
+        super().report()
+        if self.mode == "staged":
+            logging.info(f"[{self.name}] Skipped {self.skipped} known duplicates before sending.")
+
+    def rollback(self):
+        if self.conn is not None:
+            self.conn.rollback()
+
+    def close(self):
+        if self.conn is None:
+            return
+        try:
+            if self.mode == "staged":
+                self.conn.rollback()  # A failed last page would otherwise abort the DROP
+                with self.conn.cursor() as cursor:
+                    cursor.execute("DROP TABLE IF EXISTS parking_tickets_staging")
+                self.conn.commit()
+        finally:
+            self.conn.close()
+
+
+class DuckDBSink(Sink):
+    """Load into a local DuckDB file by scanning each page as an Arrow table."""
+
+    database = True
+
+    def __init__(self, path, name="duckdb"):
+        super().__init__(name)
+        self.path = path
+        self.con = None
+
+    def setup(self):
+        import duckdb
+
+        self.con = duckdb.connect(self.path)
+        self.con.execute(CREATE_DUCKDB_TABLE_QUERY)
+
+    def write(self, df):
+        batch = to_arrow(df)
+        self.con.register("batch", batch)
+        self.con.execute(f"INSERT OR IGNORE INTO parking_tickets SELECT {', '.join(COLUMNS)} FROM batch")
+        self.con.unregister("batch")
+
+    def close(self):
+        if self.con is not None:
+            self.con.close()
+
+
+class ParquetSink(Sink):
+    """Append each page as a row group to a single Parquet file."""
+
+    def __init__(self, path, name="parquet"):
+        super().__init__(name)
+        self.path = path
+        self.writer = None
+
+    def setup(self):
+        import pyarrow.parquet as pq
+
+        self.writer = pq.ParquetWriter(self.path, arrow_schema(), compression="zstd")
+
+    def write(self, df):
+        self.writer.write_table(to_arrow(df))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class SnapshotSink(Sink):
+    """Keep the most recent `days` of tickets and write them as a memory-mappable Arrow snapshot.
+
+    The file is only written by publish(), so a snapshot never gets ahead of a database
+    sink that failed in the same run. Like the database sinks, the first copy of a
+    ticket wins: later copies are dropped even when the first fell outside the window.
+    """
+
+    def __init__(self, path, days=None, name="snapshot"):
+        super().__init__(name)
+        self.path = path
+        self.days = days
+        self.tables = []
+        self.max_day = None
+        self.seen = SeenTickets()
+
+    def setup(self):
+        import snapshot
+
+        if self.days is None:
+            self.days = snapshot.SNAPSHOT_DAYS
+
+    def _cutoff(self):
+        import pyarrow as pa
+
+        return pa.scalar(self.max_day - timedelta(days=self.days - 1), pa.date32())
+
+    def write(self, df):
+        import pyarrow.compute as pc
+
+        df = df[self.seen.filter_new(df["ticket_number"])]
+        if df.empty:
+            return
+        table = to_arrow(df)
+        page_max = pc.max(table["issue_date"]).as_py()
+        if page_max is None:
+            return
+        if self.max_day is None or page_max > self.max_day:
+            # Window moved forward: trim what is already held so memory stays at ~`days` of data
+            self.max_day = page_max
+            self.tables = [t.filter(pc.greater_equal(t["issue_date"], self._cutoff())) for t in self.tables]
+        self.tables.append(table.filter(pc.greater_equal(table["issue_date"], self._cutoff())))
+
+    def publish(self):
+        import pyarrow as pa
+        import snapshot
+
+        if self.max_day is None:
+            return
+        table = pa.concat_tables(self.tables)
+        self.tables = []
+        window_start, window_end = snapshot.window_for(self.max_day, self.days)
+        snapshot.write_snapshot(table, self.path, window_start, window_end)
+
+
+def neon_sink(**kwargs):
+    """PostgresSink for the Neon database."""
+    from config import CONNECTION_STRING_Neon
+
+    return PostgresSink("neon", CONNECTION_STRING_Neon, **kwargs)
+
+
+def supabase_sink(**kwargs):
+    """PostgresSink for the Supabase database."""
+    from config import DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME
+
+    connection_string = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}?sslmode=require"
+    return PostgresSink("supabase", connection_string, **kwargs)
+
+
+def _drain(sink, pages):
+    """Worker loop: write every page from the queue until the None sentinel."""
+    while True:
+        df = pages.get()
+        if df is None:
+            break
+        if sink.failed:
+            continue  # Keep draining so the fetcher is never blocked by a dead sink
+        start = time.perf_counter()
+        try:
+            sink.write(df)
+            sink.rows += len(df)
+        except Exception as e:
+            sink.failed_batches += 1
+            logging.error(f"[{sink.name}] Write failed, skipping {len(df)} rows: {e}")
+            try:
+                sink.rollback()
+            except Exception as e:
+                sink.failed = True  # Connection is gone; later pages cannot succeed either
+                logging.error(f"[{sink.name}] Rollback failed, disabling sink: {e}")
+        finally:
+            sink.seconds += time.perf_counter() - start
+    try:
+        sink.close()
+    except Exception as e:
+        logging.error(f"[{sink.name}] Error closing sink: {e}")
+
+
+def run(sinks, limit=LIMIT):
+    """Fetch and clean each page once, then fan it out to every sink in parallel.
+
+    Each sink has its own worker thread and bounded queue, so a slow sink only
+    holds up the fetcher once it falls SINK_QUEUE_DEPTH pages behind.
+    Returns True only when every sink set up and received every page.
+    """
+    # Before any sink drops its table, so a missing token leaves the data untouched
+    fetcher = SocrataFetcher(get_api_token(), limit=limit)
+
+    ready = []
+    for sink in sinks:
+        try:
+            sink.setup()
+            ready.append(sink)
+        except Exception as e:
+            sink.failed = True
+            logging.error(f"[{sink.name}] Error setting up sink: {e}")
+
+    if not ready:
+        logging.error("No sinks available. Exiting.")
+        fetcher.close()
+        return False
+
+    queues = [queue.Queue(maxsize=SINK_QUEUE_DEPTH) for _ in ready]
+    workers = [
+        threading.Thread(target=_drain, args=(sink, pages), name=f"sink-{sink.name}")
+        for sink, pages in zip(ready, queues)
+    ]
+    for worker in workers:
+        worker.start()
+
+    start = time.perf_counter()
+    try:
+        for raw in fetcher.pages():
+            # Clean once for all sinks
+            df = clean_dataframe(raw)
+            if not df.empty:
+                for pages in queues:
+                    pages.put(df)
+    except BaseException:
+        # Incomplete run: sinks still flush, but must not publish partial results
+        for sink in ready:
+            sink.aborted = True
+        raise
+    finally:
+        for pages in queues:
+            pages.put(None)
+        for worker in workers:
+            worker.join()
+        fetcher.close()
+
+    databases_ok = all(sink.ok for sink in sinks if sink.database)
+    for sink in ready:
+        if not sink.ok:
+            continue
+        if not (databases_ok or sink.database):
+            logging.warning(f"[{sink.name}] Not published: a database sink did not load every page.")
+            continue
+        try:
+            sink.publish()
+        except Exception as e:
+            sink.failed = True
+            logging.error(f"[{sink.name}] Error publishing: {e}")
+
+    fetcher.report()
+    logging.info(f"Load finished in {time.perf_counter() - start:.1f}s.")
+    for sink in ready:
+        sink.report()
+    return all(sink.ok for sink in sinks)
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Load LA parking tickets into one or more sinks.")
+    parser.add_argument("--neon", action="store_true", help="Load into Neon PostgreSQL")
+    parser.add_argument("--supabase", action="store_true", help="Load into Supabase PostgreSQL")
+    parser.add_argument("--duckdb", metavar="PATH", help="Load into a DuckDB database file")
+    parser.add_argument("--parquet", metavar="PATH", help="Write a Parquet file")
+    parser.add_argument("--snapshot", metavar="PATH",
+                        help="Write an Arrow snapshot of the most recent days for API workers to memory-map")
+    parser.add_argument("--snapshot-days", type=int, metavar="N", help="Days kept in the snapshot")
+    parser.add_argument("--staged", action="store_true",
+                        help="Postgres: COPY into an UNLOGGED staging table and merge, skipping known duplicates")
+    parser.add_argument("--append", action="store_true",
+                        help="Postgres: keep the existing table instead of dropping it")
+    args = parser.parse_args()
+
+    pg_options = {"mode": "staged" if args.staged else "insert", "recreate": not args.append}
+    sinks = []
+    if args.neon:
+        sinks.append(neon_sink(**pg_options))
+    if args.supabase:
+        sinks.append(supabase_sink(**pg_options))
+    if args.duckdb:
+        sinks.append(DuckDBSink(args.duckdb))
+    if args.parquet:
+        sinks.append(ParquetSink(args.parquet))
+    if args.snapshot:
+        sinks.append(SnapshotSink(args.snapshot, args.snapshot_days))
+
+    if not sinks:
+        parser.error("Choose at least one sink.")
+
+    if not run(sinks):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
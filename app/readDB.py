@@ -0,0 +1,300 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2.pool import ThreadedConnectionPool
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Pool sizing; override with environment variables per deployment
+POOL_MIN = int(os.environ.get("TICKETS_POOL_MIN", 1))
+POOL_MAX = int(os.environ.get("TICKETS_POOL_MAX", 10))
+POOL_TIMEOUT = float(os.environ.get("TICKETS_POOL_TIMEOUT", 5))  # Seconds to wait for a free connection
+# Connections idle longer than this are pinged before use: Neon auto-suspend and server
+# idle timeouts close them without the pool noticing
+POOL_PING_IDLE = float(os.environ.get("TICKETS_POOL_PING_IDLE", 30))
+
+# Rows fetched per round trip from a server-side cursor
+STREAM_CHUNK_SIZE = 5000
+
+TICKET_COLUMNS = [
+    "ticket_number", "issue_date", "issue_time", "rp_state_plate",
+    "plate_expiry_date", "make", "body_style", "color", "location", "agency",
+    "violation_code", "fine_amount", "loc_lat", "loc_long"
+]
+
+# Per-day digest: row count plus column sums. Shared by the spatial index refresh and
+# reconcile, so an in-place correction of fines or locations changes it too.
+DAILY_DIGEST_QUERY = """
+SELECT issue_date, count(*) AS ticket_count, coalesce(sum(fine_amount), 0)::float8 AS fine_total,
+       coalesce(sum(loc_lat), 0)::float8 AS lat_total, coalesce(sum(loc_long), 0)::float8 AS long_total
+FROM parking_tickets
+WHERE issue_date BETWEEN %s AND %s
+GROUP BY issue_date
+"""
+
+# Prepared once per connection, then run with EXECUTE
+PREPARED_STATEMENTS = {
+    "summary_by_date": """
+        PREPARE summary_by_date (date, date) AS
+        SELECT make, color, body_style, count(*) AS count
+        FROM parking_tickets
+        WHERE issue_date BETWEEN $1 AND $2
+        GROUP BY make, color, body_style
+        ORDER BY count DESC
+    """,
+    "totals_by_date": """
+        PREPARE totals_by_date (date, date) AS
+        SELECT count(*) AS ticket_count, coalesce(sum(fine_amount), 0)::float8 AS total_fine_amount
+        FROM parking_tickets
+        WHERE issue_date BETWEEN $1 AND $2
+    """,
+    "daily_digests": "PREPARE daily_digests (date, date) AS" + DAILY_DIGEST_QUERY % ("$1", "$2"),
+}
+
+# Server-side cursors are opened with DECLARE, which cannot wrap EXECUTE, so the
+# streamed date-range query is sent as plain SQL; its plan is trivial next to the scan.
+TICKETS_BY_DATE_QUERY = """
+SELECT ticket_number, issue_date::text, issue_time::text, rp_state_plate,
+       plate_expiry_date::text, make, body_style, color, location, agency,
+       violation_code, fine_amount::float8, loc_lat::float8, loc_long::float8
+FROM parking_tickets
+WHERE issue_date BETWEEN %s AND %s
+ORDER BY issue_date, issue_time
+"""
+
+POINTS_BY_DATE_QUERY = """
+SELECT issue_date, ticket_number, loc_lat::float8, loc_long::float8, fine_amount::float8
+FROM parking_tickets
+WHERE issue_date BETWEEN %s AND %s
+ORDER BY issue_date
+"""
+POINT_COLUMNS = ["issue_date", "ticket_number", "loc_lat", "loc_long", "fine_amount"]
+
+# Plain integers instead of date/time objects so rows convert straight into NumPy arrays
+TIME_COLUMNS_QUERY = """
+SELECT issue_date - DATE '1970-01-01' AS epoch_day,
+       extract(epoch FROM issue_time)::int AS seconds,
+       violation_code,
+       fine_amount::float8
+FROM parking_tickets
+WHERE issue_date BETWEEN %s AND %s
+"""
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection frees up within the timeout."""
+
+
+class _Connection(psycopg2.extensions.connection):
+    """Connection that remembers which statements it has prepared and when it was last used."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+        self.last_used = time.monotonic()
+
+
+class TicketStore:
+    """Bounded Postgres connection pool serving the read queries of the web apps."""
+
+    def __init__(self, connection_string, minconn=POOL_MIN, maxconn=POOL_MAX, timeout=POOL_TIMEOUT):
+        self.pool = ThreadedConnectionPool(
+            minconn, maxconn, connection_string, connection_factory=_Connection
+        )
+        self.maxconn = maxconn
+        self.timeout = timeout
+        # ThreadedConnectionPool raises instead of waiting when exhausted; the semaphore makes callers queue
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._stream_id = 0
+        self.stats = {
+            "checkouts": 0,
+            "in_use": 0,
+            "peak_in_use": 0,
+            "waits": 0,
+            "wait_seconds": 0.0,
+            "timeouts": 0,
+            "errors": 0,
+            "reconnects": 0,
+        }
+        logging.info(f"Connection pool ready ({minconn}-{maxconn} connections).")
+
+    @contextmanager
+    def connection(self):
+        """Check a connection out of the pool for the duration of the block."""
+        start = time.perf_counter()
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.stats["waits"] += 1
+            if not self._slots.acquire(timeout=self.timeout):
+                with self._lock:
+                    self.stats["timeouts"] += 1
+                raise PoolTimeout(f"No database connection available after {self.timeout}s")
+        waited = time.perf_counter() - start
+
+        with self._lock:
+            self.stats["checkouts"] += 1
+            self.stats["in_use"] += 1
+            self.stats["peak_in_use"] = max(self.stats["peak_in_use"], self.stats["in_use"])
+            self.stats["wait_seconds"] += waited
+
+        conn = None
+        broken = False
+        try:
+            conn = self._checkout()
+            yield conn
+            conn.rollback()  # Read-only: end the transaction so the connection goes back idle
+        except psycopg2.Error:
+            broken = conn is None or conn.closed != 0
+            with self._lock:
+                self.stats["errors"] += 1
+            if conn is not None and not broken:
+                conn.rollback()
+            raise
+        finally:
+            if conn is not None:
+                conn.last_used = time.monotonic()
+                self.pool.putconn(conn, close=broken or conn.closed != 0)
+            with self._lock:
+                self.stats["in_use"] -= 1
+            self._slots.release()
+
+    def _checkout(self):
+        """Take a connection from the pool, replacing any the server closed while it sat idle."""
+        for _ in range(self.maxconn + 1):  # Every idle connection may be stale after a suspend
+            conn = self.pool.getconn()
+            if conn.closed == 0 and time.monotonic() - conn.last_used < POOL_PING_IDLE:
+                return conn
+            try:
+                if conn.closed == 0:
+                    with conn.cursor() as cursor:
+                        cursor.execute("SELECT 1")
+                    conn.rollback()
+                    return conn
+            except psycopg2.Error as e:
+                logging.warning(f"Discarding stale pooled connection: {e}")
+            with self._lock:
+                self.stats["reconnects"] += 1
+            self.pool.putconn(conn, close=True)
+        raise psycopg2.OperationalError("No working database connection after replacing stale ones")
+
+    def _execute_prepared(self, conn, name, params):
+        """Run a prepared statement, preparing it on this connection first if needed."""
+        with conn.cursor() as cursor:
+            if name not in conn.prepared:
+                cursor.execute(PREPARED_STATEMENTS[name])
+                conn.prepared.add(name)
+            placeholders = ", ".join(["%s"] * len(params))
+            cursor.execute(f"EXECUTE {name} ({placeholders})", params)
+            columns = [desc[0] for desc in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def summary(self, start_date, end_date):
+        """Ticket counts by make, color and body style for a date range."""
+        with self.connection() as conn:
+            return self._execute_prepared(conn, "summary_by_date", (start_date, end_date))
+
+    def totals(self, start_date, end_date):
+        """Ticket count and total fine amount for a date range."""
+        with self.connection() as conn:
+            return self._execute_prepared(conn, "totals_by_date", (start_date, end_date))[0]
+
+    def daily_digests(self, start_date, end_date):
+        """Map each issue_date in the range to its (count, fine_total, lat_total, long_total) digest."""
+        with self.connection() as conn:
+            rows = self._execute_prepared(conn, "daily_digests", (start_date, end_date))
+        return {row["issue_date"]: (row["ticket_count"], row["fine_total"], row["lat_total"], row["long_total"])
+                for row in rows}
+
+    def _stream(self, query, params, chunk_size, as_dicts=None):
+        """Yield row chunks from a server-side cursor; rows become dicts when column names are given."""
+        with self._lock:
+            self._stream_id += 1
+            cursor_name = f"tickets_stream_{self._stream_id}"
+
+        with self.connection() as conn:
+            with conn.cursor(name=cursor_name) as cursor:
+                cursor.itersize = chunk_size
+                cursor.execute(query, params)
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield [dict(zip(as_dicts, row)) for row in rows] if as_dicts else rows
+
+    def stream_tickets(self, start_date, end_date, chunk_size=STREAM_CHUNK_SIZE):
+        """Yield lists of ticket dicts from a server-side cursor, chunk_size rows at a time.
+
+        The connection stays checked out until the generator is exhausted or closed.
+        """
+        return self._stream(TICKETS_BY_DATE_QUERY, (start_date, end_date), chunk_size, TICKET_COLUMNS)
+
+    def stream_points(self, start_date, end_date, chunk_size=50000):
+        """Yield (issue_date, ticket_number, loc_lat, loc_long, fine_amount) tuples in issue_date order."""
+        return self._stream(POINTS_BY_DATE_QUERY, (start_date, end_date), chunk_size)
+
+    def stream_time_columns(self, start_date, end_date, chunk_size=50000):
+        """Yield (epoch_day, seconds_since_midnight, violation_code, fine_amount) tuples."""
+        return self._stream(TIME_COLUMNS_QUERY, (start_date, end_date), chunk_size)
+
+    def health(self):
+        """Round-trip a trivial query and report latency alongside pool metrics."""
+        start = time.perf_counter()
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                    cursor.fetchone()
+            ok, error = True, None
+        except (PoolTimeout, psycopg2.Error) as e:
+            ok, error = False, str(e)
+        result = {
+            "ok": ok,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+            "pool": self.metrics(),
+        }
+        if error:
+            result["error"] = error
+        return result
+
+    def metrics(self):
+        """Snapshot of pool usage; saturation is the share of connections checked out."""
+        with self._lock:
+            stats = dict(self.stats)
+        stats["max_connections"] = self.maxconn
+        stats["saturation"] = round(stats["in_use"] / self.maxconn, 3)
+        stats["wait_seconds"] = round(stats["wait_seconds"], 3)
+        return stats
+
+    def close(self):
+        """Close every pooled connection."""
+        self.pool.closeall()
+
+
+def iter_json_array(chunks):
+    """Serialize chunks of rows as one JSON array, one string per chunk, without building it in memory."""
+    yield "["
+    first = True
+    for rows in chunks:
+        if not rows:
+            continue
+        body = ",".join(json.dumps(row) for row in rows)
+        yield body if first else "," + body
+        first = False
+    yield "]"
+
+
+def create_store():
+    """Build the TicketStore from DATABASE_URL, falling back to the Neon connection string."""
+    connection_string = os.environ.get("DATABASE_URL")
+    if not connection_string:
+        from config import CONNECTION_STRING_Neon
+        connection_string = CONNECTION_STRING_Neon
+    return TicketStore(connection_string)
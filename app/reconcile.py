@@ -0,0 +1,270 @@
+import argparse
+import logging
+import math
+import time
+import os
+from datetime import date, timedelta
+
+import pandas as pd
+import psycopg2
+from config import get_api_token
+from loader import COLUMNS, YEARS, clean_dataframe, copy_buffer, neon_sink, supabase_sink, to_arrow
+from readDB import DAILY_DIGEST_QUERY
+from socrata import SocrataFetcher
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# SoQL has no hash function, so a day's "digest" is its row count plus column sums:
+# late tickets change the count, amended fines or locations change the sums.
+# Upstream duplicates and rows clean_dataframe drops keep some days different even
+# after a reload; reconcile_state remembers those so they are not reloaded every run.
+SOCRATA_DIGEST_SELECT = (
+    "date_trunc_ymd(issue_date) AS day, count(ticket_number) AS ticket_count, "
+    "sum(fine_amount) AS fine_total, sum(loc_lat) AS lat_total, sum(loc_long) AS long_total"
+)
+
+# Days that still differed after their last reload, with both digests at that moment.
+# While neither side has changed since, reloading the day again cannot help.
+CREATE_STATE_TABLE_QUERY = """
+CREATE TABLE IF NOT EXISTS reconcile_state (
+    day DATE PRIMARY KEY,
+    source_count BIGINT NOT NULL,
+    source_fine FLOAT8 NOT NULL,
+    source_lat FLOAT8 NOT NULL,
+    source_long FLOAT8 NOT NULL,
+    db_count BIGINT NOT NULL,
+    db_fine FLOAT8 NOT NULL,
+    db_lat FLOAT8 NOT NULL,
+    db_long FLOAT8 NOT NULL,
+    reloaded_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+"""
+
+STATE_QUERY = """
+SELECT day, source_count, source_fine, source_lat, source_long, db_count, db_fine, db_lat, db_long
+FROM reconcile_state
+WHERE day BETWEEN %s AND %s
+"""
+
+UPSERT_STATE_QUERY = """
+INSERT INTO reconcile_state (day, source_count, source_fine, source_lat, source_long,
+                             db_count, db_fine, db_lat, db_long)
+VALUES %s
+ON CONFLICT (day) DO UPDATE SET
+    source_count = EXCLUDED.source_count, source_fine = EXCLUDED.source_fine,
+    source_lat = EXCLUDED.source_lat, source_long = EXCLUDED.source_long,
+    db_count = EXCLUDED.db_count, db_fine = EXCLUDED.db_fine,
+    db_lat = EXCLUDED.db_lat, db_long = EXCLUDED.db_long, reloaded_at = now();
+"""
+
+# Digest of a day with no rows
+EMPTY_DIGEST = (0, 0.0, 0.0, 0.0)
+
+# Session-private staging table, so a reconcile never collides with a staged load
+CREATE_STAGING_TABLE_QUERY = """
+CREATE TEMP TABLE IF NOT EXISTS reconcile_staging (LIKE parking_tickets INCLUDING DEFAULTS);
+"""
+
+COPY_STAGING_QUERY = f"""
+COPY reconcile_staging ({", ".join(COLUMNS)})
+FROM STDIN WITH (FORMAT csv, NULL '\\N')
+"""
+
+# Amended tickets can move between days, so a re-ingested row replaces any existing copy
+REPLACE_FROM_STAGING_QUERY = f"""
+INSERT INTO parking_tickets ({", ".join(COLUMNS)})
+SELECT DISTINCT ON (ticket_number) {", ".join(COLUMNS)}
+FROM reconcile_staging
+ON CONFLICT (ticket_number) DO UPDATE SET
+    {", ".join(f"{col} = EXCLUDED.{col}" for col in COLUMNS if col != "ticket_number")};
+"""
+
+# Reloaded days re-read for the snapshot, as text so to_arrow parses them like API pages
+SNAPSHOT_ROWS_QUERY = """
+SELECT ticket_number, issue_date::text, issue_time::text, rp_state_plate, plate_expiry_date::text,
+       make, body_style, color, location, agency, violation_code,
+       fine_amount::float8, loc_lat::float8, loc_long::float8
+FROM parking_tickets
+WHERE issue_date = ANY(%s)
+"""
+
+# Tolerances for comparing sums computed by two different engines
+FINE_TOLERANCE = 0.01
+COORD_TOLERANCE = 1e-4
+
+
+def _number(value):
+    """Parse a Socrata aggregate cell; nulls (sum over no values) count as zero."""
+    return 0.0 if pd.isna(value) else float(value)
+
+
+def socrata_digests(fetcher, start_day, end_day):
+    """Per-day (count, fine_total, lat_total, long_total) from one aggregate SoQL query."""
+    where = f"issue_date between '{start_day.isoformat()}T00:00:00' and '{end_day.isoformat()}T23:59:59'"
+    df = fetcher.aggregate(SOCRATA_DIGEST_SELECT, where=where, group="date_trunc_ymd(issue_date)")
+    digests = {}
+    for row in df.itertuples(index=False):
+        day = date.fromisoformat(str(row.day)[:10])
+        digests[day] = (int(row.ticket_count), _number(row.fine_total), _number(row.lat_total), _number(row.long_total))
+    return digests
+
+
+def db_digests(conn, start_day, end_day):
+    """Per-day (count, fine_total, lat_total, long_total) from parking_tickets."""
+    with conn.cursor() as cursor:
+        cursor.execute(DAILY_DIGEST_QUERY, (start_day, end_day))
+        rows = cursor.fetchall()
+    conn.commit()
+    return {row[0]: (row[1], row[2], row[3], row[4]) for row in rows}
+
+
+def same_digest(source, ours):
+    """True when the two per-day digests agree within floating point tolerance."""
+    if source is None or ours is None:
+        return source is None and ours is None
+    return (source[0] == ours[0]
+            and math.isclose(source[1], ours[1], abs_tol=FINE_TOLERANCE)
+            and math.isclose(source[2], ours[2], abs_tol=COORD_TOLERANCE)
+            and math.isclose(source[3], ours[3], abs_tol=COORD_TOLERANCE))
+
+
+def changed_days(source, ours):
+    """Days whose digests differ, including days present on only one side."""
+    return sorted(day for day in set(source) | set(ours) if not same_digest(source.get(day), ours.get(day)))
+
+
+def load_state(conn, start_day, end_day):
+    """{day: (source_digest, db_digest)} recorded for days that stayed different after a reload."""
+    with conn.cursor() as cursor:
+        cursor.execute(CREATE_STATE_TABLE_QUERY)
+        cursor.execute(STATE_QUERY, (start_day, end_day))
+        rows = cursor.fetchall()
+    conn.commit()
+    return {row[0]: (tuple(row[1:5]), tuple(row[5:9])) for row in rows}
+
+
+def settled(day, source, ours, state):
+    """True when the day still has exactly the digests it had after its last reload."""
+    if day not in state:
+        return False
+    source_then, ours_then = state[day]
+    return (same_digest(source.get(day, EMPTY_DIGEST), source_then)
+            and same_digest(ours.get(day, EMPTY_DIGEST), ours_then))
+
+
+def save_state(conn, days, source, ours):
+    """Record days that still differ after a reload and forget the ones that now match."""
+    from psycopg2.extras import execute_values
+
+    differing = [day for day in days if not same_digest(source.get(day), ours.get(day))]
+    with conn.cursor() as cursor:
+        cursor.execute("DELETE FROM reconcile_state WHERE day = ANY(%s)", (days,))
+        if differing:
+            execute_values(cursor, UPSERT_STATE_QUERY, [
+                (day, *source.get(day, EMPTY_DIGEST), *ours.get(day, EMPTY_DIGEST)) for day in differing
+            ])
+    conn.commit()
+    return differing
+
+
+def reload_day(conn, fetcher, day):
+    """Re-fetch one day and swap it in within a single transaction. Returns rows loaded."""
+    where = f"issue_date >= '{day.isoformat()}T00:00:00' and issue_date < '{(day + timedelta(days=1)).isoformat()}T00:00:00'"
+    frames = [clean_dataframe(df) for df in fetcher.pages(where=where)]
+    frames = [df for df in frames if not df.empty]
+
+    with conn.cursor() as cursor:
+        cursor.execute("TRUNCATE reconcile_staging")
+        for df in frames:
+            cursor.copy_expert(COPY_STAGING_QUERY, copy_buffer(df))
+        cursor.execute("DELETE FROM parking_tickets WHERE issue_date = %s", (day,))
+        cursor.execute(REPLACE_FROM_STAGING_QUERY)
+        loaded = cursor.rowcount
+    conn.commit()  # Readers see either the old day or the new one, never a mix
+    return loaded
+
+
+def refresh_snapshot(conn, path, days):
+    """Rewrite the reloaded days that fall inside the snapshot at `path`."""
+    import snapshot
+
+    with conn.cursor() as cursor:
+        cursor.execute(SNAPSHOT_ROWS_QUERY, (days,))
+        rows = cursor.fetchall()
+    conn.commit()
+    table = to_arrow(pd.DataFrame(rows, columns=COLUMNS))
+    if snapshot.replace_days(path, days, table):
+        logging.info(f"Snapshot {path} refreshed for the reloaded days.")
+
+
+def reconcile(connection_string, start_day, end_day, dry_run=False):
+    """Compare per-day digests and re-ingest only the days that differ."""
+    # Only the years the loader keeps can ever match
+    start_day = max(start_day, date(min(YEARS), 1, 1))
+    end_day = min(end_day, date(max(YEARS), 12, 31))
+    if start_day > end_day:
+        logging.warning("Requested range is outside the loaded years. Nothing to do.")
+        return []
+
+    start = time.perf_counter()
+    fetcher = SocrataFetcher(get_api_token())
+    conn = psycopg2.connect(connection_string)
+    try:
+        source = socrata_digests(fetcher, start_day, end_day)
+        ours = db_digests(conn, start_day, end_day)
+        state = load_state(conn, start_day, end_day)
+        differ = changed_days(source, ours)
+        days = [day for day in differ if not settled(day, source, ours, state)]
+        logging.info(f"Compared {len(set(source) | set(ours))} days: {len(differ)} differ, "
+                     f"{len(differ) - len(days)} unchanged since a reload that could not make them match.")
+        if dry_run or not days:
+            return days
+
+        with conn.cursor() as cursor:
+            cursor.execute(CREATE_STAGING_TABLE_QUERY)
+        conn.commit()
+        for day in days:
+            expected = source.get(day, (0,))[0]
+            loaded = reload_day(conn, fetcher, day)
+            logging.info(f"Reloaded {day}: {loaded} rows (source reports {expected}).")
+
+        # Days that still differ hold upstream duplicates or rows the loader rejects
+        ours = db_digests(conn, days[0], days[-1])
+        for day in save_state(conn, days, source, ours):
+            logging.warning(f"{day} still differs after reload: source {source.get(day, (0,))[0]} rows, "
+                            f"database {ours.get(day, (0,))[0]} (duplicate or invalid upstream rows); "
+                            f"skipped until either side changes.")
+
+        path = os.environ.get("TICKETS_SNAPSHOT")
+        if path and os.path.exists(path):
+            refresh_snapshot(conn, path, days)
+    finally:
+        conn.close()
+        fetcher.report()
+        fetcher.close()
+
+    logging.info(f"Reconciliation finished in {time.perf_counter() - start:.1f}s.")
+    return days
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Re-ingest only the days whose data changed upstream.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--neon", action="store_true", help="Reconcile the Neon database")
+    target.add_argument("--supabase", action="store_true", help="Reconcile the Supabase database")
+    parser.add_argument("--start", type=date.fromisoformat, default=date(min(YEARS), 1, 1), help="First day (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, default=date.today(), help="Last day (YYYY-MM-DD)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report the days that differ")
+    args = parser.parse_args()
+
+    sink = neon_sink() if args.neon else supabase_sink()
+    days = reconcile(sink.connection_string, args.start, args.end, args.dry_run)
+    if args.dry_run:
+        for day in days:
+            print(day.isoformat())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import logging
+import os
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from dates import epoch_day, parse_day
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Days of the most recent data kept in the snapshot
+SNAPSHOT_DAYS = int(os.environ.get("TICKETS_SNAPSHOT_DAYS", 30))
+
+# How often a worker stats the file to notice a snapshot written by a newer load
+RELOAD_CHECK_SECONDS = 5
+
+def write_snapshot(table, path, window_start, window_end):
+    """Write an uncompressed Arrow IPC (Feather v2) file sorted by issue date and time.
+
+    Uncompressed buffers are what let readers memory-map the file without copying;
+    the file is swapped in with os.replace so readers never see a partial write.
+    """
+    table = table.sort_by([("issue_date", "ascending"), ("issue_time", "ascending")]).combine_chunks()
+    metadata = dict(table.schema.metadata or {})
+    metadata.update({b"window_start": window_start.isoformat().encode(), b"window_end": window_end.isoformat().encode()})
+    table = table.replace_schema_metadata(metadata)
+
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+    logging.info(f"Snapshot written to {path}: {table.num_rows} rows, {window_start} to {window_end}.")
+
+
+def replace_days(path, days, table):
+    """Swap the rows of the given days in an existing snapshot for `table`.
+
+    Rows in `table` outside the snapshot window are ignored, and any older copy of a
+    ticket in `table` is dropped even if it sat on another day. Returns False when
+    none of the days fall inside the window, in which case the file is left alone.
+    """
+    mapped = _Mapped(path)
+    days = [day for day in days if mapped.window_start <= day <= mapped.window_end]
+    if not days:
+        return False
+
+    day_values = pa.array([epoch_day(day) for day in days], pa.int32())
+    existing = mapped.table
+    keep = pc.invert(pc.or_(
+        pc.is_in(existing["issue_date"].cast(pa.int32()), value_set=day_values),
+        pc.is_in(existing["ticket_number"], value_set=table["ticket_number"].combine_chunks()),
+    ))
+    window = pc.and_(pc.is_in(table["issue_date"].cast(pa.int32()), value_set=day_values),
+                     pc.is_valid(table["ticket_number"]))
+    combined = pa.concat_tables([existing.filter(keep), table.filter(window).cast(existing.schema)])
+    write_snapshot(combined, path, mapped.window_start, mapped.window_end)
+    return True
+
+
+class _Mapped:
+    """One memory-mapped snapshot file and its sorted issue_date index."""
+
+    def __init__(self, path):
+        stat = os.stat(path)
+        self.identity = (stat.st_ino, stat.st_mtime_ns)
+        self.source = pa.memory_map(path, "r")
+        self.table = pa.ipc.open_file(self.source).read_all()  # Zero-copy: buffers point into the mapping
+        days = self.table.column("issue_date")
+        days = days.chunk(0) if days.num_chunks == 1 else days.combine_chunks()
+        self.days = days.view(pa.int32()).to_numpy(zero_copy_only=False)
+        metadata = self.table.schema.metadata or {}
+        self.window_start = date.fromisoformat(metadata[b"window_start"].decode())
+        self.window_end = date.fromisoformat(metadata[b"window_end"].decode())
+
+
+class Snapshot:
+    """Read-only view over the memory-mapped snapshot of the most recent days.
+
+    Every worker on a host maps the same file, so the pages live once in the OS
+    page cache. Queries slice the sorted table by binary search on issue_date.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._mapped = _Mapped(path)
+        self._checked = time.monotonic()
+        self._lock = threading.Lock()
+        logging.info(f"Snapshot mapped from {path}: {self._mapped.table.num_rows} rows, "
+                     f"{self._mapped.window_start} to {self._mapped.window_end}.")
+
+    def _current(self):
+        """Return the mapped file, remapping it if the ETL has replaced it since."""
+        if time.monotonic() - self._checked >= RELOAD_CHECK_SECONDS:
+            with self._lock:
+                self._checked = time.monotonic()
+                try:
+                    stat = os.stat(self.path)
+                    if (stat.st_ino, stat.st_mtime_ns) != self._mapped.identity:
+                        self._mapped = _Mapped(self.path)
+                        logging.info(f"Snapshot remapped: {self._mapped.window_start} to {self._mapped.window_end}.")
+                except (OSError, pa.ArrowException) as e:
+                    logging.error(f"Keeping previous snapshot, reload failed: {e}")
+        return self._mapped
+
+    def covers(self, start_date, end_date):
+        """True when the whole range falls inside the snapshot window.
+
+        Missing or malformed dates are never covered; the database path validates them.
+        """
+        try:
+            start_day = parse_day(start_date)
+            end_day = parse_day(end_date)
+        except ValueError:
+            return False
+        if start_day is None or end_day is None:
+            return False
+        mapped = self._current()
+        return mapped.window_start <= start_day <= end_day <= mapped.window_end
+
+    def _slice(self, start_date, end_date):
+        mapped = self._current()
+        lo = np.searchsorted(mapped.days, epoch_day(start_date), side="left")
+        hi = np.searchsorted(mapped.days, epoch_day(end_date), side="right")
+        return mapped.table.slice(lo, hi - lo)
+
+    def stream_tickets(self, start_date, end_date, chunk_size=5000):
+        """Yield lists of ticket dicts shaped like TicketStore.stream_tickets."""
+        table = self._slice(start_date, end_date)
+        for name in ("issue_date", "issue_time", "plate_expiry_date"):
+            table = table.set_column(table.schema.get_field_index(name), name, pc.cast(table[name], pa.string()))
+        for batch in table.to_batches(max_chunksize=chunk_size):
+            yield batch.to_pylist()
+
+    def summary(self, start_date, end_date):
+        """Ticket counts by make, color and body style, largest first."""
+        grouped = self._slice(start_date, end_date).group_by(["make", "color", "body_style"]) \
+            .aggregate([("ticket_number", "count")]) \
+            .sort_by([("ticket_number_count", "descending")])
+        return [
+            {"make": row["make"], "color": row["color"], "body_style": row["body_style"],
+             "count": row["ticket_number_count"]}
+            for row in grouped.to_pylist()
+        ]
+
+    def totals(self, start_date, end_date):
+        """Ticket count and total fine amount for a date range."""
+        table = self._slice(start_date, end_date)
+        total = pc.sum(table["fine_amount"]).as_py() if table.num_rows else 0.0
+        return {"ticket_count": table.num_rows, "total_fine_amount": float(total or 0.0)}
+
+
+def window_for(max_day, days=SNAPSHOT_DAYS):
+    """(first, last) day of a snapshot ending at max_day."""
+    return max_day - timedelta(days=days - 1), max_day
+
+
+def open_snapshot():
+    """Map the snapshot named by TICKETS_SNAPSHOT, or return None when unset or unreadable."""
+    path = os.environ.get("TICKETS_SNAPSHOT")
+    if not path:
+        return None
+    try:
+        return Snapshot(path)
+    except (OSError, KeyError, pa.ArrowException) as e:
+        logging.error(f"Snapshot {path} unavailable: {e}")
+        return None
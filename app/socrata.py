@@ -0,0 +1,169 @@
+import io
+import logging
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# CSV flavour of the Los Angeles Parking Citations resource
+CSV_URL = "https://data.lacity.org/resource/4f5p-udkv.csv"
+
+# Page size bounds; the fetcher moves between them based on observed latency and payload
+MIN_LIMIT = 5000
+MAX_LIMIT = 200000
+START_LIMIT = 50000
+TARGET_SECONDS = 8  # Aim for pages that take about this long end to end
+MAX_PAGE_BYTES = 64 * 1024 * 1024  # Decoded CSV size above which pages shrink
+
+# Retry policy for 429, 5xx and network errors
+MAX_RETRIES = 6
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+TIMEOUT = (10, 120)  # (connect, read) seconds
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class FetchError(Exception):
+    """Raised when a page cannot be fetched after all retries."""
+
+
+def _retry_after(response):
+    """Seconds requested by a Retry-After header, if any."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+class SocrataFetcher:
+    """Paginated CSV fetcher with pooled connections, backoff and an adaptive page size."""
+
+    def __init__(self, app_token=None, url=CSV_URL, limit=START_LIMIT):
+        self.url = url
+        self.limit = limit
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self.session.headers.update({"Accept": "text/csv", "Accept-Encoding": "gzip"})
+        if app_token:
+            self.session.headers["X-App-Token"] = app_token
+        self.rows = 0
+        self.wire_bytes = 0
+        self.decoded_bytes = 0
+        self.seconds = 0.0
+        self.retries = 0
+        self.waited = 0.0  # Backoff and Retry-After sleeps, kept out of the throughput figures
+
+    def _get(self, params, adapt=True):
+        """GET and parse one CSV response, retrying transient failures with jittered exponential backoff.
+
+        Returns (df, response, seconds), seconds covering only the attempt that succeeded so
+        backoff sleeps never count as transfer time. With adapt=False a timeout never changes $limit, which
+        is what aggregate queries need: their $limit is a result cap, not a page size.
+        """
+        for attempt in range(MAX_RETRIES + 1):
+            wait = None
+            start = time.perf_counter()
+            try:
+                response = self.session.get(self.url, params=params, timeout=TIMEOUT)
+                if response.status_code == 200:
+                    content = response.content
+                    df = pd.read_csv(io.BytesIO(content), dtype=str) if content.strip() else pd.DataFrame()
+                    return df, response, time.perf_counter() - start
+                if response.status_code not in RETRY_STATUSES:
+                    raise FetchError(f"API request failed with status code {response.status_code}: {response.text[:200]}")
+                wait = _retry_after(response)
+                reason = f"status {response.status_code}"
+            except (requests.ConnectionError, requests.Timeout,
+                    requests.exceptions.ChunkedEncodingError, requests.exceptions.ContentDecodingError,
+                    pd.errors.ParserError) as e:
+                # ParserError: a body cut off mid-row parses as a ragged CSV
+                reason = type(e).__name__
+                if adapt and isinstance(e, requests.Timeout) and self.limit > MIN_LIMIT:
+                    self._shrink()  # A page too big to arrive in time will not do better on retry
+                    params["$limit"] = self.limit
+
+            if attempt == MAX_RETRIES:
+                break
+            if wait is None:
+                wait = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))  # Full jitter
+            self.retries += 1
+            self.waited += wait
+            logging.warning(f"Fetch failed ({reason}), retry {attempt + 1}/{MAX_RETRIES} in {wait:.1f}s.")
+            time.sleep(wait)
+        raise FetchError(f"Giving up after {MAX_RETRIES} retries ({reason}).")
+
+    def _shrink(self):
+        self.limit = max(MIN_LIMIT, self.limit // 2)
+        logging.info(f"Page size reduced to {self.limit}.")
+
+    def _adapt(self, seconds, decoded):
+        """Grow fast, small pages and shrink slow or oversized ones."""
+        if seconds > TARGET_SECONDS or decoded > MAX_PAGE_BYTES:
+            self._shrink()
+        elif seconds < TARGET_SECONDS / 2 and decoded < MAX_PAGE_BYTES / 2:
+            self.limit = min(MAX_LIMIT, int(self.limit * 1.5))
+
+    def fetch_page(self, offset, where=None, order=":id"):
+        """Fetch one page as a DataFrame of strings; returns (df, requested_limit)."""
+        params = {"$limit": self.limit, "$offset": offset, "$order": order}
+        if where:
+            params["$where"] = where
+
+        df, response, elapsed = self._get(params)  # May lower $limit after a timeout
+
+        decoded = len(response.content)
+        wire = getattr(response.raw, "tell", lambda: decoded)() or decoded  # Compressed bytes off the socket
+        self.rows += len(df)
+        self.wire_bytes += wire
+        self.decoded_bytes += decoded
+        self.seconds += elapsed
+        self._adapt(elapsed, decoded)
+
+        logging.info(f"Fetched {len(df)} records at offset {offset} in {elapsed:.1f}s "
+                     f"({wire / 1e6:.1f} MB on the wire, {decoded / 1e6:.1f} MB decoded).")
+        return df, params["$limit"]
+
+    def aggregate(self, select, where=None, group=None, limit=MAX_LIMIT):
+        """Run one aggregate SoQL query and return its result as a DataFrame of strings."""
+        params = {"$select": select, "$limit": limit}
+        if where:
+            params["$where"] = where
+        if group:
+            params["$group"] = group
+        df, _, _ = self._get(params, adapt=False)
+        return df
+
+    def pages(self, where=None, order=":id"):
+        """Yield DataFrames until a short page signals the end of the result set."""
+        offset = 0
+        while True:
+            df, limit = self.fetch_page(offset, where, order)
+            if not df.empty:
+                yield df
+            if len(df) < limit:
+                break
+            offset += len(df)
+
+    def report(self):
+        """Log effective throughput for the run."""
+        seconds = self.seconds or 1e-9
+        logging.info(f"Fetched {self.rows} rows in {self.seconds:.1f}s: "
+                     f"{self.wire_bytes / 1e6 / seconds:.2f} MB/s on the wire, "
+                     f"{self.decoded_bytes / 1e6 / seconds:.2f} MB/s decoded, "
+                     f"{self.rows / seconds:,.0f} rows/s, {self.retries} retries ({self.waited:.1f}s waiting).")
+
+    def close(self):
+        self.session.close()
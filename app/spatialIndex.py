@@ -0,0 +1,482 @@
+import bisect
+import logging
+import threading
+import time
+from datetime import date, timedelta
+from itertools import groupby
+
+import numpy as np
+from dates import month_bounds, parse_day
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Local equirectangular projection centred on downtown Los Angeles.
+# Over the ~100 km the city spans the distance error stays well under 1%.
+EARTH_RADIUS_M = 6371008.8
+ORIGIN_LAT = 34.05
+ORIGIN_LON = -118.25
+METERS_PER_DEG_LAT = EARTH_RADIUS_M * np.pi / 180
+METERS_PER_DEG_LON = METERS_PER_DEG_LAT * np.cos(np.radians(ORIGIN_LAT))
+
+# Coordinates outside this box are placeholders (0, 0 from cleaning, or state-plane feet)
+LAT_RANGE = (33.0, 35.0)
+LON_RANGE = (-119.5, -117.0)
+
+CELL_SIZE_M = 100  # Roughly one city block
+GRID_SPAN_M = 240000  # Square covering LAT_RANGE x LON_RANGE around the origin
+
+# How often the background thread re-checks per-day counts
+REFRESH_SECONDS = 900
+
+
+def project(lat, lon):
+    """Project degrees to metres east/north of the origin."""
+    x = (np.asarray(lon, dtype=np.float64) - ORIGIN_LON) * METERS_PER_DEG_LON
+    y = (np.asarray(lat, dtype=np.float64) - ORIGIN_LAT) * METERS_PER_DEG_LAT
+    return x, y
+
+
+def unproject(x, y):
+    """Inverse of project: metres back to (lat, lon) degrees."""
+    lat = ORIGIN_LAT + np.asarray(y, dtype=np.float64) / METERS_PER_DEG_LAT
+    lon = ORIGIN_LON + np.asarray(x, dtype=np.float64) / METERS_PER_DEG_LON
+    return lat, lon
+
+
+def _check_point(lat, lon):
+    if lat is None or lon is None or not (np.isfinite(lat) and np.isfinite(lon)):
+        raise ValueError("lat and lon are required numbers")
+
+
+def _check_positive(name, value):
+    if value is None or not value > 0:
+        raise ValueError(f"{name} must be a positive number")
+
+
+def _day_points(day, tickets, lat, lon, fine, index):
+    """Validated, projected columns (cells, days, x, y, fine, tickets) for one day's tickets."""
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    fine = np.nan_to_num(np.asarray(fine, dtype=np.float64))
+    valid = ((lat >= LAT_RANGE[0]) & (lat <= LAT_RANGE[1])
+             & (lon >= LON_RANGE[0]) & (lon <= LON_RANGE[1]))
+
+    x, y = project(lat[valid], lon[valid])
+    days = np.full(len(x), day.toordinal(), dtype=np.int32)
+    return index.cell_of(x, y), days, x, y, fine[valid], np.asarray(tickets, dtype=object)[valid]
+
+
+class Partition:
+    """All tickets of one calendar month, sorted by grid cell so each cell is a contiguous slice.
+
+    Points keep their issue day, so a range covering part of the month filters the
+    candidates of a cell search. Partitions are immutable: replacing a day builds a
+    new one, so queries never see a half-updated month.
+    """
+
+    __slots__ = ("month", "day_digests", "cells", "days", "x", "y", "fine", "tickets",
+                 "hot_cells", "hot_counts", "hot_fines")
+
+    def __init__(self, month, day_digests, cells, days, x, y, fine, tickets):
+        self.month = month
+        self.day_digests = day_digests  # date -> database digest (count, fine, lat, long sums) when loaded
+
+        order = np.argsort(cells, kind="stable")
+        self.cells = cells[order]
+        self.days = days[order]  # date ordinals
+        self.x = x[order]
+        self.y = y[order]
+        self.fine = fine[order]
+        self.tickets = tickets[order]
+
+        # Per-cell aggregates so hotspot ranking over whole months never touches individual tickets
+        self.hot_cells, first = np.unique(self.cells, return_index=True)
+        bounds = np.append(first, len(self.cells))
+        self.hot_counts = np.diff(bounds)
+        self.hot_fines = np.add.reduceat(self.fine, first) if len(first) else np.empty(0)
+
+    @classmethod
+    def empty(cls, month):
+        return cls(month, {}, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32),
+                   np.empty(0), np.empty(0), np.empty(0), np.empty(0, dtype=object))
+
+    def columns(self):
+        return self.cells, self.days, self.x, self.y, self.fine, self.tickets
+
+    def replace_days(self, loaded, removed=()):
+        """New partition with `loaded` ({day: (digest, columns)}) swapped in and `removed` days dropped."""
+        day_digests = {day: digest for day, digest in self.day_digests.items() if day not in removed}
+        day_digests.update({day: digest for day, (digest, _) in loaded.items()})
+        stale = [day.toordinal() for day in set(loaded) | set(removed)]
+        keep = ~np.isin(self.days, stale)
+        parts = [[column[keep] for column in self.columns()]] + [columns for _, columns in loaded.values()]
+        return Partition(self.month, day_digests, *(np.concatenate(column) for column in zip(*parts)))
+
+    def __len__(self):
+        return len(self.cells)
+
+
+class SpatialIndex:
+    """Uniform-grid index over projected ticket locations, partitioned by month.
+
+    Each month is one cell-sorted Partition, so a query over years of data runs a
+    few dozen binary searches rather than one per day. A refresh still works day
+    by day: it rebuilds only the months holding days whose row counts changed.
+    Queries first cut candidate cells with binary search, then apply the exact
+    distance or box test to those points only.
+    """
+
+    def __init__(self, cell_size_m=CELL_SIZE_M):
+        self.cell_size = float(cell_size_m)
+        self.grid_cells = int(np.ceil(GRID_SPAN_M / self.cell_size))
+        self.partitions = {}  # (year, month) -> Partition
+        self.months = []
+        self.ready = False
+        self._rollups = {}  # (first_month, last_month) -> per-cell totals over that run of whole months
+        self._generation = 0  # Bumped on every update so a rollup built from replaced months is not cached
+        self._lock = threading.Lock()
+
+    # -- grid -------------------------------------------------------------
+
+    def _cell_coords(self, x, y):
+        half = GRID_SPAN_M / 2
+        cx = np.clip(np.floor((np.asarray(x) + half) / self.cell_size), 0, self.grid_cells - 1).astype(np.int64)
+        cy = np.clip(np.floor((np.asarray(y) + half) / self.cell_size), 0, self.grid_cells - 1).astype(np.int64)
+        return cx, cy
+
+    def cell_of(self, x, y):
+        """Row-major grid cell id for projected coordinates."""
+        cx, cy = self._cell_coords(x, y)
+        return cy * self.grid_cells + cx
+
+    def cell_center(self, cells):
+        """(lat, lon) of the centre of each cell id."""
+        cells = np.asarray(cells, dtype=np.int64)
+        half = GRID_SPAN_M / 2
+        x = (cells % self.grid_cells + 0.5) * self.cell_size - half
+        y = (cells // self.grid_cells + 0.5) * self.cell_size - half
+        return unproject(x, y)
+
+    # -- building ---------------------------------------------------------
+
+    def update_month(self, month, loaded, removed=()):
+        """Swap freshly loaded days into a month and drop removed ones.
+
+        `loaded` maps each day to (digest, (tickets, lat, lon, fine)), the digest being
+        the day's entry from TicketStore.daily_digests.
+        """
+        with self._lock:
+            current = self.partitions.get(month)
+        loaded = {day: (digest, _day_points(day, *rows, self)) for day, (digest, rows) in loaded.items()}
+        partition = (current or Partition.empty(month)).replace_days(loaded, set(removed))
+        with self._lock:
+            self._rollups.clear()
+            self._generation += 1
+            if partition.day_digests:
+                if month not in self.partitions:
+                    bisect.insort(self.months, month)
+                self.partitions[month] = partition
+            elif self.partitions.pop(month, None) is not None:
+                self.months.remove(month)
+        return partition
+
+    def refresh(self, store, start_date=None, end_date=None):
+        """Rebuild only the days whose digest differs from the database.
+
+        The digest (row count plus fine and coordinate sums) also catches days whose
+        fines or locations were corrected in place by a reconcile run.
+
+        Returns the number of days rebuilt or dropped.
+        """
+        start = time.perf_counter()
+        start_day = parse_day(start_date, date(1900, 1, 1))
+        end_day = parse_day(end_date, date(9999, 12, 31))
+        digests = store.daily_digests(start_day, end_day)
+
+        with self._lock:
+            known = {day: digest for p in self.partitions.values()
+                     for day, digest in p.day_digests.items() if start_day <= day <= end_day}
+        stale = sorted(day for day, digest in digests.items() if known.get(day) != digest)
+        removed = sorted(day for day in known if day not in digests)
+        for month, days in groupby(removed, key=lambda day: (day.year, day.month)):
+            self.update_month(month, {}, list(days))
+
+        # Contiguous runs of stale days become one range query each
+        for run_start, run_end in _runs(stale):
+            self._load_range(store, run_start, run_end, {day: digests[day] for day in stale})
+
+        self.ready = True
+        logging.info(f"Spatial index refreshed {len(stale)} day(s), dropped {len(removed)}, "
+                     f"{self.size()} points in {len(self.months)} months ({time.perf_counter() - start:.1f}s).")
+        return len(stale) + len(removed)
+
+    def _load_range(self, store, start_day, end_day, wanted):
+        """Stream points for a date range, rebuilding each month once all of its days have arrived.
+
+        `wanted` maps the days to rebuild to their database digests.
+        """
+        month, pending, current, buffer = None, {}, None, []
+
+        def flush_day():
+            if current in wanted and buffer:
+                _, tickets, lat, lon, fine = zip(*buffer)
+                pending[current] = (wanted[current], (tickets, lat, lon, fine))
+
+        for rows in store.stream_points(start_day, end_day):
+            for row in rows:
+                if row[0] != current:
+                    flush_day()
+                    current, buffer = row[0], []
+                    if (current.year, current.month) != month:
+                        if pending:
+                            self.update_month(month, pending)
+                        month, pending = (current.year, current.month), {}
+                buffer.append(row)
+        flush_day()
+        if pending:
+            self.update_month(month, pending)
+
+    def size(self):
+        """Total indexed points."""
+        with self._lock:
+            return sum(len(p) for p in self.partitions.values())
+
+    # -- queries ----------------------------------------------------------
+
+    def _select(self, start_date, end_date):
+        """(partition, days) for every month touching the inclusive range.
+
+        days is None when the whole month is in range, else the (first, last) date
+        ordinals to keep.
+        """
+        start_day = parse_day(start_date, date.min)
+        end_day = parse_day(end_date, date.max)
+        with self._lock:
+            lo = bisect.bisect_left(self.months, (start_day.year, start_day.month))
+            hi = bisect.bisect_right(self.months, (end_day.year, end_day.month))
+            partitions = [self.partitions[month] for month in self.months[lo:hi]]
+
+        selected = []
+        for partition in partitions:
+            first, last = month_bounds(*partition.month)
+            if start_day <= first and last <= end_day:
+                selected.append((partition, None))
+            else:
+                selected.append((partition, (max(first, start_day).toordinal(), min(last, end_day).toordinal())))
+        return selected
+
+    def _row_spans(self, x0, y0, x1, y1):
+        """First and last cell id of every grid row the box overlaps."""
+        cx0, cy0 = self._cell_coords(x0, y0)
+        cx1, cy1 = self._cell_coords(x1, y1)
+        rows = np.arange(cy0, cy1 + 1, dtype=np.int64) * self.grid_cells
+        return rows + cx0, rows + cx1
+
+    def _candidates(self, partition, days, spans):
+        """Indices of points in cells overlapping the box; one binary search pair per grid row."""
+        starts = np.searchsorted(partition.cells, spans[0], side="left")
+        lengths = np.searchsorted(partition.cells, spans[1], side="right") - starts
+
+        # Concatenate the [start, end) spans without a Python loop
+        total = int(lengths.sum())
+        if not total:
+            return np.empty(0, dtype=np.int64)
+        idx = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+        if days is not None:
+            day = partition.days[idx]
+            idx = idx[(day >= days[0]) & (day <= days[1])]
+        return idx
+
+    def _within(self, selected, x, y, radius):
+        """(partition, indices, distances) for points within radius metres of (x, y)."""
+        matches = []
+        spans = self._row_spans(x - radius, y - radius, x + radius, y + radius)
+        for partition, days in selected:
+            idx = self._candidates(partition, days, spans)
+            if not len(idx):
+                continue
+            dist = np.hypot(partition.x[idx] - x, partition.y[idx] - y)
+            keep = dist <= radius
+            if keep.any():
+                matches.append((partition, idx[keep], dist[keep]))
+        return matches
+
+    def _result(self, matches, limit, by_distance=False):
+        """Summarise matches and materialise at most `limit` tickets (nearest first when by_distance)."""
+        if not matches:
+            return {"count": 0, "fine_total": 0.0, "tickets": []}
+        owner = np.concatenate([np.full(len(idx), n) for n, (_, idx, _) in enumerate(matches)])
+        local = np.concatenate([idx for _, idx, _ in matches])
+        dist = np.concatenate([d for _, _, d in matches])
+        count = len(local)
+        fine_total = float(sum(p.fine[idx].sum() for p, idx, _ in matches))
+
+        if by_distance:
+            # Partial selection of the nearest `limit` without sorting everything
+            pick = np.argpartition(dist, limit - 1)[:limit] if count > limit else np.arange(count)
+            pick = pick[np.argsort(dist[pick], kind="stable")]
+        else:
+            pick = np.arange(min(count, limit))
+
+        # Gather the picked points column by column, one fancy index per partition
+        columns = {"x": np.float64, "y": np.float64, "days": np.int64, "fine": np.float64, "tickets": object}
+        columns = {name: np.empty(len(pick), dtype=dtype) for name, dtype in columns.items()}
+        picked_owner, picked_local = owner[pick], local[pick]
+        for n, (partition, _, _) in enumerate(matches):
+            mine = picked_owner == n
+            if mine.any():
+                for name, column in columns.items():
+                    column[mine] = getattr(partition, name)[picked_local[mine]]
+        lat, lon = unproject(columns["x"], columns["y"])
+
+        tickets = []
+        for b, ticket_number, day, la, lo, fine in zip(pick, columns["tickets"], columns["days"], lat, lon,
+                                                       columns["fine"]):
+            ticket = {
+                "ticket_number": ticket_number,
+                "issue_date": date.fromordinal(int(day)).isoformat(),
+                "loc_lat": round(float(la), 6),
+                "loc_long": round(float(lo), 6),
+                "fine_amount": float(fine),
+            }
+            if not np.isnan(dist[b]):
+                ticket["distance_m"] = round(float(dist[b]), 1)
+            tickets.append(ticket)
+        return {"count": count, "fine_total": fine_total, "tickets": tickets}
+
+    def radius(self, lat, lon, radius_m, start_date=None, end_date=None, limit=1000):
+        """Tickets within radius_m metres of a point, nearest first."""
+        _check_point(lat, lon)
+        _check_positive("radius_m", radius_m)
+        _check_positive("limit", limit)
+        x, y = project(lat, lon)
+        matches = self._within(self._select(start_date, end_date), float(x), float(y), float(radius_m))
+        return self._result(matches, limit, by_distance=True)
+
+    def bbox(self, min_lat, min_lon, max_lat, max_lon, start_date=None, end_date=None, limit=1000):
+        """Tickets inside a lat/lon bounding box."""
+        _check_point(min_lat, min_lon)
+        _check_point(max_lat, max_lon)
+        if min_lat > max_lat or min_lon > max_lon:
+            raise ValueError("min_lat/min_lon must not exceed max_lat/max_lon")
+        _check_positive("limit", limit)
+        x0, y0 = project(min_lat, min_lon)
+        x1, y1 = project(max_lat, max_lon)
+        matches = []
+        spans = self._row_spans(x0, y0, x1, y1)
+        for partition, days in self._select(start_date, end_date):
+            idx = self._candidates(partition, days, spans)
+            if not len(idx):
+                continue
+            px, py = partition.x[idx], partition.y[idx]
+            keep = (px >= x0) & (px <= x1) & (py >= y0) & (py <= y1)
+            if keep.any():
+                matches.append((partition, idx[keep], np.full(int(keep.sum()), np.nan)))
+        return self._result(matches, limit)
+
+    def nearest(self, lat, lon, k=10, start_date=None, end_date=None):
+        """The k tickets closest to a point, found by doubling the search radius."""
+        _check_point(lat, lon)
+        _check_positive("k", k)
+        x, y = project(lat, lon)
+        selected = self._select(start_date, end_date)
+        radius = self.cell_size
+        while True:
+            matches = self._within(selected, float(x), float(y), radius)
+            if sum(len(idx) for _, idx, _ in matches) >= k or radius >= GRID_SPAN_M:
+                break
+            radius *= 2
+        result = self._result(matches, k, by_distance=True)
+        result["count"] = len(result["tickets"])
+        result["fine_total"] = sum(t["fine_amount"] for t in result["tickets"])
+        return result
+
+    def _rollup(self, partitions):
+        """Per-cell totals over consecutive whole months, cached until any month changes."""
+        key = (partitions[0].month, partitions[-1].month)
+        with self._lock:
+            rollup = self._rollups.get(key)
+            generation = self._generation
+        if rollup is None:
+            rollup = _combine_cells([(p.hot_cells, p.hot_counts, p.hot_fines) for p in partitions])
+            with self._lock:
+                if generation == self._generation:
+                    self._rollups[key] = rollup
+        return rollup
+
+    def hotspots(self, start_date=None, end_date=None, top=50, by="fine_total"):
+        """Grid cells ranked by total fines (or ticket count) over the date range."""
+        _check_positive("top", top)
+        selected = self._select(start_date, end_date)
+        whole = [partition for partition, days in selected if days is None]
+        pieces = [self._rollup(whole)] if whole else []
+        for partition, days in selected:
+            if days is not None:
+                keep = (partition.days >= days[0]) & (partition.days <= days[1])
+                pieces.append((partition.cells[keep], np.ones(int(keep.sum())), partition.fine[keep]))
+        # A cached rollup on its own is already combined
+        unique, count_totals, fine_totals = pieces[0] if len(pieces) == 1 and whole else _combine_cells(pieces)
+        if not len(unique):
+            return []
+        score = count_totals if by == "count" else fine_totals
+
+        top = min(top, len(unique))
+        best = np.argpartition(-score, top - 1)[:top]
+        best = best[np.argsort(-score[best], kind="stable")]
+        lat, lon = self.cell_center(unique[best])
+        return [
+            {
+                "cell": int(unique[b]),
+                "loc_lat": round(float(la), 6),
+                "loc_long": round(float(lo), 6),
+                "cell_size_m": self.cell_size,
+                "count": int(count_totals[b]),
+                "fine_total": float(fine_totals[b]),
+            }
+            for b, la, lo in zip(best, lat, lon)
+        ]
+
+
+def _combine_cells(pieces):
+    """Sum (cells, counts, fines) pieces into unique occupied cells with their totals."""
+    if not pieces:
+        return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)
+    cells = np.concatenate([c for c, _, _ in pieces])
+    if not len(cells):
+        return cells.astype(np.int64), np.empty(0), np.empty(0)
+    counts = np.concatenate([n for _, n, _ in pieces])
+    fines = np.concatenate([f for _, _, f in pieces])
+
+    # Cell ids are bounded, so dense bincount over the occupied id range beats sorting
+    base = cells.min()
+    count_totals = np.bincount(cells - base, weights=counts)
+    fine_totals = np.bincount(cells - base, weights=fines)
+    unique = np.flatnonzero(count_totals)
+    return unique + base, count_totals[unique], fine_totals[unique]
+
+
+def _runs(days):
+    """Group sorted days into (first, last) runs of consecutive dates."""
+    runs = []
+    for day in days:
+        if runs and day - runs[-1][1] == timedelta(days=1):
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return [tuple(run) for run in runs]
+
+
+def start_refresh_thread(index, store, interval=REFRESH_SECONDS):
+    """Build the index in the background, then keep it in sync every `interval` seconds."""
+    def loop():
+        while True:
+            try:
+                index.refresh(store)
+            except Exception as e:
+                logging.error(f"Spatial index refresh failed: {e}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=loop, name="spatial-index-refresh", daemon=True)
+    thread.start()
+    return thread
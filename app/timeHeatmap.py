@@ -0,0 +1,153 @@
+import logging
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from dates import month_bounds, parse_range
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
+
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+HOURS = 24
+
+# Months this close to today may still receive tickets, so their cache entries expire quickly
+RECENT_DAYS = 7
+RECENT_TTL_SECONDS = 900
+
+# Older months only change when a reconcile run reloads a day, so they are rebuilt a few times a day
+OLD_TTL_SECONDS = 6 * 3600
+
+
+def _months(start_day, end_day):
+    """Yield (year, month) for every month touched by the range."""
+    year, month = start_day.year, start_day.month
+    while (year, month) <= (end_day.year, end_day.month):
+        yield year, month
+        year, month = year + month // 12, month % 12 + 1
+
+
+class Histogram:
+    """Ticket counts and fine totals binned by violation_code x weekday x hour."""
+
+    __slots__ = ("codes", "counts", "fines")
+
+    def __init__(self, codes, counts, fines):
+        self.codes = codes  # Sorted violation codes, one per leading row of counts/fines
+        self.counts = counts  # int64 (codes, 7, 24)
+        self.fines = fines  # float64 (codes, 7, 24)
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty(0, dtype=object), np.zeros((0, 7, HOURS), dtype=np.int64), np.zeros((0, 7, HOURS)))
+
+    @classmethod
+    def from_columns(cls, epoch_day, seconds, codes, fines):
+        """Bin columnar arrays with a single bincount per measure."""
+        if not len(epoch_day):
+            return cls.empty()
+        weekday = (np.asarray(epoch_day, dtype=np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+        hour = np.clip(np.asarray(seconds, dtype=np.int64) // 3600, 0, HOURS - 1)
+        unique, code_idx = np.unique(np.asarray(codes, dtype=object).astype(str), return_inverse=True)
+
+        flat = (code_idx * 7 + weekday) * HOURS + hour
+        size = len(unique) * 7 * HOURS
+        counts = np.bincount(flat, minlength=size).reshape(len(unique), 7, HOURS)
+        fine_totals = np.bincount(flat, weights=np.asarray(fines, dtype=np.float64), minlength=size)
+        return cls(unique.astype(object), counts, fine_totals.reshape(len(unique), 7, HOURS))
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        """Bin (epoch_day, seconds, violation_code, fine_amount) row chunks one chunk at a time."""
+        parts = []
+        for rows in chunks:
+            if rows:
+                epoch_day, seconds, codes, fines = zip(*rows)
+                parts.append(cls.from_columns(epoch_day, seconds, codes, fines))
+        return cls.merge(parts)
+
+    @classmethod
+    def merge(cls, histograms):
+        """Sum histograms whose violation code sets may differ."""
+        histograms = [h for h in histograms if len(h.codes)]
+        if not histograms:
+            return cls.empty()
+        if len(histograms) == 1:
+            return histograms[0]
+        codes = np.unique(np.concatenate([h.codes for h in histograms]).astype(str)).astype(object)
+        counts = np.zeros((len(codes), 7, HOURS), dtype=np.int64)
+        fines = np.zeros((len(codes), 7, HOURS))
+        for h in histograms:
+            rows = np.searchsorted(codes.astype(str), h.codes.astype(str))
+            counts[rows] += h.counts
+            fines[rows] += h.fines
+        return cls(codes, counts, fines)
+
+    def to_dict(self, violation_codes=None):
+        """JSON-ready heatmap; violation_codes restricts the per-code breakdown."""
+        keep = np.ones(len(self.codes), dtype=bool)
+        if violation_codes:
+            keep = np.isin(self.codes.astype(str), [str(code) for code in violation_codes])
+        counts, fines = self.counts[keep], self.fines[keep]
+        return {
+            "weekdays": WEEKDAYS,
+            "hours": list(range(HOURS)),
+            "total": {
+                "counts": counts.sum(axis=0).tolist(),
+                "fine_totals": np.round(fines.sum(axis=0), 2).tolist(),
+            },
+            "by_violation_code": {
+                code: {"counts": c.tolist(), "fine_totals": np.round(f, 2).tolist()}
+                for code, c, f in zip(self.codes[keep], counts, fines)
+            },
+        }
+
+
+class HeatmapCache:
+    """Per-month histograms built from the database and reused across requests.
+
+    Whole months come from the cache; the partial months at either end of a
+    range are binned directly from the rows of just those days.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._months = {}  # (year, month) -> (Histogram, built_at)
+        self._lock = threading.Lock()
+
+    def _build(self, start_day, end_day):
+        return Histogram.from_chunks(self.store.stream_time_columns(start_day, end_day))
+
+    def month(self, year, month):
+        """Histogram for a whole month, rebuilt when missing or expired."""
+        first, last = month_bounds(year, month)
+        with self._lock:
+            cached = self._months.get((year, month))
+        if cached is not None:
+            histogram, built_at = cached
+            recent = last >= date.today() - timedelta(days=RECENT_DAYS)
+            if time.time() - built_at < (RECENT_TTL_SECONDS if recent else OLD_TTL_SECONDS):
+                return histogram
+
+        start = time.perf_counter()
+        histogram = self._build(first, last)
+        with self._lock:
+            self._months[(year, month)] = (histogram, time.time())
+        logging.info(f"Heatmap for {year}-{month:02d} built in {time.perf_counter() - start:.2f}s.")
+        return histogram
+
+    def heatmap(self, start_date, end_date, violation_codes=None):
+        """Combined heatmap for an inclusive date range; raises ValueError for a bad range."""
+        start_day, end_day = parse_range(start_date, end_date)
+        parts = []
+        for year, month in _months(start_day, end_day):
+            first, last = month_bounds(year, month)
+            if start_day <= first and last <= end_day:
+                parts.append(self.month(year, month))
+            else:
+                parts.append(self._build(max(first, start_day), min(last, end_day)))
+        result = Histogram.merge(parts).to_dict(violation_codes)
+        result["start_date"] = start_day.isoformat()
+        result["end_date"] = end_day.isoformat()
+        return result